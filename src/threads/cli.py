@@ -1,48 +1,122 @@
+import io
+import re
 import sys
 import time
-
-import pyperclip
-from rich.console import Console
-from rich.prompt import Prompt
-from rich.table import Table
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import cache, lru_cache
+from typing import TYPE_CHECKING
 
 from .db import (
-    add_tag,
+    add_tags,
     archive_thread,
     attach_resource,
     create_thread,
-    get_last_n_threads,
     get_most_recent_thread,
     get_resources_for_thread,
     get_tags_for_thread,
     get_thread_by_id,
-    list_threads,
+    list_threads_with_tags,
+    load_thread_view,
+    transaction,
     unarchive_thread,
-    update_thread_last_active,
 )
 
 
-console = Console()
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.text import Text
+
+
+class _LazyConsole:
+    """Stand-in for the Rich console; imports Rich on first use."""
+
+    def __getattr__(self, name: str):
+        global console
+        from rich.console import Console
+
+        console = Console()
+        return getattr(console, name)
+
+
+console: 'Console' = _LazyConsole()  # type: ignore[assignment]
+
+
+@cache
+def _markup(template: str) -> 'Text':
+    """Parse a static Rich markup string once per process."""
+    from rich.text import Text
+
+    return Text.from_markup(template)
+
+
+def print_error(message: str) -> None:
+    """Print `message` after a red 'Error:' prefix. The message is not parsed as markup."""
+    console.print(_markup('[red]Error:[/red] ') + message)
+
+
+@dataclass
+class ParsedCmd:
+    """Command line arguments, classified in a single pass."""
+
+    command: str
+    positional: list[str] = field(default_factory=list)
+    deep: bool = False
+    all_: bool = False
+    tags: list[str] = field(default_factory=list)
+    thread_id: int | None = None
+
+    @property
+    def all_tags(self) -> list[str]:
+        """Tags to add to the thread: unknown flags, plus 'deep' for --deep."""
+        return [*self.tags, 'deep'] if self.deep else self.tags
 
 
-def parse_args(args: list[str]) -> tuple[str, list[str], list[str]]:
-    """Parse command and extract flags.
-    Returns (command, known_flags, unknown_flags)
-    Known flags are --deep, --all
+# Commands whose first positional argument is a thread ID
+ID_COMMANDS = frozenset(('view', 'archive', 'unarchive', 'export'))
+COMMANDS = ID_COMMANDS | {'new', 'attach', 'ls', 'current'}
+
+
+def parse_args(args: list[str]) -> ParsedCmd:
+    """Parse command, positional arguments and flags.
+    Known flags are --deep, --all and, for attach, --to <id>; any other --flag
+    becomes a tag. For commands in ID_COMMANDS (and for --to) the thread ID is validated here and
+    a ValueError with a user-facing message is raised if it is missing or invalid.
     """
-    command = args[1].lower() if len(args) > 1 else ''
-    known_flags = []
-    unknown_flags = []
-
-    for arg in args[2:]:
-        if arg.startswith('--'):
-            if arg in ['--deep', '--all']:
-                known_flags.append(arg)
-            else:
-                # Strip -- prefix for tag name
-                unknown_flags.append(arg[2:])
+    parsed = ParsedCmd(command=args[1].lower() if len(args) > 1 else '')
+    positional_append = parsed.positional.append
+    tags_append = parsed.tags.append
+
+    rest = iter(args[2:])
+    for arg in rest:
+        if not arg.startswith('--'):
+            positional_append(arg)
+        elif arg == '--deep':
+            parsed.deep = True
+        elif arg == '--all':
+            parsed.all_ = True
+        elif arg == '--to' and parsed.command == 'attach':
+            # Consumes the next argument as the target thread ID
+            parsed.thread_id = _parse_thread_id(next(rest, None))
+        else:
+            # Strip -- prefix for tag name
+            tags_append(arg.removeprefix('--'))
+
+    if parsed.command in ID_COMMANDS:
+        parsed.thread_id = _parse_thread_id(
+            parsed.positional[0] if parsed.positional else None
+        )
+
+    return parsed
+
 
-    return command, known_flags, unknown_flags
+def _parse_thread_id(arg: str | None) -> int:
+    if arg is None:
+        raise ValueError('No thread ID specified.')
+    # isdigit() alone would also accept non-ASCII digits such as '²'
+    if not (arg.isascii() and arg.isdigit()):
+        raise ValueError('Thread ID must be an integer.')
+    return int(arg)
 
 
 def main():
@@ -50,147 +124,149 @@ def main():
         print_help()
         sys.exit(0)
 
-    command, known_flags, unknown_flags = parse_args(sys.argv)
+    try:
+        parsed = parse_args(sys.argv)
+    except ValueError as e:
+        print_error(str(e))
+        sys.exit(1)
+
+    if parsed.command not in COMMANDS:
+        print_help()
+        return
+
+    if parsed.command == 'attach' and parsed.thread_id is None:
+        # The picker waits for user input; don't hold a transaction open meanwhile
+        run_command(parsed)
+        return
+
+    # One transaction per invocation, so all of a command's writes commit together
+    with transaction():
+        run_command(parsed)
+
+
+def run_command(parsed: ParsedCmd) -> None:
+    """Run the cmd_* handler for an already parsed, known command."""
+    command = parsed.command
 
     if command == 'new':
-        if len(sys.argv) < 3:
-            console.print('[red]Error:[/red] No question specified.')
+        if not parsed.positional:
+            print_error('No question specified.')
             sys.exit(1)
-        # Get the question by joining all non-flag arguments after "new"
-        question_parts = []
-        for arg in sys.argv[2:]:
-            if not arg.startswith('--'):
-                question_parts.append(arg)
-        question = ' '.join(question_parts)
-        thread_id = cmd_new(question)
+        # The question is all non-flag arguments after "new"
+        thread_id = cmd_new(' '.join(parsed.positional))
 
         # Add any unknown flags as tags
-        for tag in unknown_flags:
-            add_tag(thread_id, tag)
-        if '--deep' in known_flags:
-            add_tag(thread_id, 'deep')
+        if parsed.all_tags:
+            add_tags(thread_id, parsed.all_tags)
 
     elif command == 'attach':
-        # e.g. thread attach "something"
+        # e.g. thread attach "something" [--to id]
         # if none provided, read from clipboard
-        content_parts = []
-        for arg in sys.argv[2:]:
-            if not arg.startswith('--'):
-                content_parts.append(arg)
-        content = ' '.join(content_parts) if content_parts else ''
+        content = ' '.join(parsed.positional)
 
         if not content.strip():
             # try reading from clipboard
+            import pyperclip
+
             clip = pyperclip.paste()
             if clip and isinstance(clip, str):
                 content = clip.strip()
             else:
-                console.print(
-                    '[red]Error:[/red] No content passed and clipboard empty.'
-                )
+                print_error('No content passed and clipboard empty.')
                 sys.exit(1)
-        thread_id = cmd_attach(content)
+        thread_id = cmd_attach(content, parsed.thread_id)
 
         # Add any unknown flags as tags
-        if thread_id:
-            for tag in unknown_flags:
-                add_tag(thread_id, tag)
-            if '--deep' in known_flags:
-                add_tag(thread_id, 'deep')
+        if thread_id and parsed.all_tags:
+            add_tags(thread_id, parsed.all_tags)
 
     elif command == 'ls':
         # Check for --all flag to show archived threads
-        include_archived = '--all' in known_flags
-        cmd_ls(include_archived)
+        cmd_ls(parsed.all_)
 
     elif command == 'archive':
         # thread archive [id]
-        thread_id = get_thread_id_from_args()
-        cmd_archive(thread_id)
+        cmd_archive(parsed.thread_id)
 
     elif command == 'unarchive':
         # thread unarchive [id]
-        thread_id = get_thread_id_from_args()
-        cmd_unarchive(thread_id)
+        cmd_unarchive(parsed.thread_id)
 
     elif command == 'view':
         # thread view [id]
-        thread_id = get_thread_id_from_args()
-        cmd_view(thread_id)
+        cmd_view(parsed.thread_id)
 
     elif command == 'current':
         # Check for --all flag to potentially include archived threads
-        include_archived = '--all' in known_flags
-        cmd_current(include_archived)
+        cmd_current(parsed.all_)
 
     elif command == 'export':
         # thread export [id]
-        thread_id = get_thread_id_from_args()
-        cmd_export(thread_id)
-
-    else:
-        print_help()
-
+        cmd_export(parsed.thread_id)
+
+
+_HELP_TEMPLATE = """\
+{title}Threads v0.1 commands:{reset}
+  thread new "question text" [--deep] [--tag1] [--tag2] ...
+  thread attach "content" [--to id] [--deep] [--tag1] [--tag2] ...  (uses interactive picker unless --to is given)
+  thread ls [--all]   (list threads, --all to include archived)
+  thread view [id]  (view a thread's details)
+  thread current [--all]  (view the most recently active thread)
+  thread archive [id]  (archive a thread)
+  thread unarchive [id]  (unarchive a thread)
+  thread export [id]  (export a thread to clipboard)
+
+{dim}Flags:{reset}
+  --deep            Mark thread as requiring deep analysis
+  --all             Include archived threads in listing/current
+  --to id           Attach straight to thread #id (skips the picker)
+  --tag1, --tag2    Any flag starting with -- becomes a tag
+"""
+HELP_TEXT = _HELP_TEMPLATE.format(title='', dim='', reset='')
+HELP_TEXT_ANSI = _HELP_TEMPLATE.format(
+    title='\x1b[1;36m', dim='\x1b[2m', reset='\x1b[0m'
+)
 
-def get_thread_id_from_args() -> int:
-    """Parse thread ID from command line arguments."""
-    thread_id = None
-    for arg in sys.argv[2:]:
-        if not arg.startswith('--'):
-            if not arg.isdigit():
-                console.print('[red]Error:[/red] Thread ID must be an integer.')
-                sys.exit(1)
-            thread_id = int(arg)
-            break
 
-    if thread_id is None:
-        console.print('[red]Error:[/red] No thread ID specified.')
-        sys.exit(1)
+def print_help():
+    # Pre-rendered and written directly: help never imports or starts Rich
+    sys.stdout.write(HELP_TEXT_ANSI if sys.stdout.isatty() else HELP_TEXT)
 
-    return thread_id
 
+def cmd_new(question: str) -> int:
+    from rich.markup import escape
 
-def print_help():
-    console.print('[bold cyan]Threads v0.1 commands:[/bold cyan]')
-    console.print('  thread new "question text" [--deep] [--tag1] [--tag2] ...')
+    thread_id = create_thread(question)
     console.print(
-        '  thread attach "content" [--deep] [--tag1] [--tag2] ...  (uses interactive picker)'
+        f'[green]Created new thread (#{thread_id}):[/green] "{escape(question)}"'
     )
-    console.print('  thread ls [--all]   (list threads, --all to include archived)')
-    console.print("  thread view [id]  (view a thread's details)")
-    console.print('  thread current [--all]  (view the most recently active thread)')
-    console.print('  thread archive [id]  (archive a thread)')
-    console.print('  thread unarchive [id]  (unarchive a thread)')
-    console.print('  thread export [id]  (export a thread to clipboard)')
-    console.print('')
-    console.print('[dim]Flags:[/dim]')
-    console.print('  --deep            Mark thread as requiring deep analysis')
-    console.print('  --all             Include archived threads in listing/current')
-    console.print('  --tag1, --tag2    Any flag starting with -- becomes a tag')
+    return thread_id
 
 
-def cmd_new(question: str) -> int:
-    thread_id = create_thread(question)
-    console.print(f'[green]Created new thread (#{thread_id}):[/green] "{question}"')
-    return thread_id
+def cmd_attach(content: str, thread_id: int | None = None) -> int | None:
+    if thread_id is not None:
+        # Target given with --to: no picker, no prompt
+        return attach_to_thread(thread_id, content)
 
+    from rich.markup import escape
+    from rich.prompt import Prompt
 
-def cmd_attach(content: str) -> int | None:
     # Show an interactive picker with the last 5 active threads
-    recent = get_last_n_threads(n=5, include_archived=False)
-    console.print('[bold cyan]Recent Threads[/bold cyan]')
+    recent = list_threads_with_tags(limit=5, include_archived=False)
+    now = time.time()
+    console.print(_markup('[bold cyan]Recent Threads[/bold cyan]'))
     for i, row in enumerate(recent, start=1):
-        # row = (id, question, last_active, is_archived)
-        t_id, t_question, t_last_active, is_archived = row
-        ago = time_since(t_last_active)
-        # Get tags
-        tags = get_tags_for_thread(t_id)
-        tags_str = f' [{", ".join(tags)}]' if tags else ''
+        # row = (id, question, resource_count, last_active, is_archived, tags)
+        t_id, t_question, _, t_last_active, is_archived, tags = row
+        ago = time_since(t_last_active, now)
+        # User text is escaped so brackets in it are shown, not parsed as markup
+        tags_str = escape(f' [{", ".join(tags)}]') if tags else ''
         status = ' [yellow]ARCHIVED[/yellow]' if is_archived else ''
         console.print(
-            f'  [bold]{i}.[/bold] (#{t_id}) "{t_question}"{tags_str}{status} [dim]{ago} ago[/dim]'
+            f'  [bold]{i}.[/bold] (#{t_id}) "{escape(t_question)}"{tags_str}{status} '
+            f'[dim]{ago} ago[/dim]'
         )
-    console.print('  [bold]n.[/bold] New thread')
+    console.print(_markup('  [bold]n.[/bold] New thread'))
     console.print('')
 
     choice = Prompt.ask(
@@ -204,7 +280,8 @@ def cmd_attach(content: str) -> int | None:
         rtype = guess_resource_type(content)
         attach_resource(new_thread_id, content, rtype)
         console.print(
-            f'[green]Attached resource to new thread (#{new_thread_id}):[/green] "{new_question}"'
+            f'[green]Attached resource to new thread (#{new_thread_id}):[/green] '
+            f'"{escape(new_question)}"'
         )
         return new_thread_id
     else:
@@ -212,13 +289,13 @@ def cmd_attach(content: str) -> int | None:
         try:
             idx = int(choice)
             if idx < 1 or idx > len(recent):
-                console.print('[red]Invalid choice.[/red]')
+                console.print(_markup('[red]Invalid choice.[/red]'))
                 return None
             selected = recent[idx - 1]
             selected_id = selected[0]
 
             # Check if thread is archived
-            if selected[3]:  # is_archived
+            if selected[4]:  # is_archived
                 console.print(
                     f'[yellow]Warning: Thread #{selected_id} is archived.[/yellow]'
                 )
@@ -237,144 +314,173 @@ def cmd_attach(content: str) -> int | None:
             console.print(f'[green]Attached resource to thread #{selected_id}[/green]')
             return selected_id
         except ValueError:
-            console.print('[red]Invalid input.[/red]')
+            console.print(_markup('[red]Invalid input.[/red]'))
             return None
 
 
+def attach_to_thread(thread_id: int, content: str) -> int | None:
+    """Attach content to a specific thread without showing the picker."""
+    thread = get_thread_by_id(thread_id)
+    if not thread:
+        print_error(f'Thread #{thread_id} not found.')
+        return None
+
+    attach_resource(thread_id, content, guess_resource_type(content))
+    if thread[4]:  # is_archived
+        console.print(f'[yellow]Note: Thread #{thread_id} is archived.[/yellow]')
+    console.print(f'[green]Attached resource to thread #{thread_id}[/green]')
+    return thread_id
+
+
+LS_TITLE = 'Threads (by last active)'
+LS_COLUMNS = ('ID', 'Question/Title', 'Tags', 'Resources', 'Last Active', 'Status')
+
+
 def cmd_ls(include_archived: bool = False):
-    threads = list_threads(
+    threads = list_threads_with_tags(
         limit=50, include_archived=include_archived
     )  # default 50, can be changed
     if not threads:
-        console.print('[dim]No threads found.[/dim]')
+        console.print(_markup('[dim]No threads found.[/dim]'))
         return
 
-    table = Table(title='Threads (by last active)', show_lines=False)
+    now = time.time()
+    rows = []
+    for t_id, question, resource_count, last_active, is_archived, tags in threads:
+        ago = time_since(last_active, now)
+        tags_str = ', '.join(tags) if tags else ''
+        status = 'Archived' if is_archived else 'Active'
+        rows.append(
+            (str(t_id), question, tags_str, str(resource_count), f'{ago} ago', status)
+        )
+
+    if not sys.stdout.isatty():
+        # Piped output gets no styling anyway, so skip Rich's table layout
+        print(format_plain_table(LS_TITLE, LS_COLUMNS, rows))
+        return
+
+    from rich.table import Table
+    from rich.text import Text
+
+    table = Table(title=LS_TITLE, show_lines=False)
     table.add_column('ID', style='bold')
     table.add_column('Question/Title', style='cyan')
     table.add_column('Tags', style='yellow')
     table.add_column('Resources', style='magenta')
     table.add_column('Last Active', style='dim')
     table.add_column('Status', style='yellow')
+    # Cells are plain text: wrapping them in Text skips per-cell markup parsing
+    # (and keeps brackets in questions and tags literal)
+    for row in rows:
+        table.add_row(*map(Text, row))
+    console.print(table)
 
-    for t_id, question, resource_count, last_active, is_archived in threads:
-        ago = time_since(last_active)
-        tags = get_tags_for_thread(t_id)
-        tags_str = ', '.join(tags) if tags else ''
-        status = '[yellow]Archived[/yellow]' if is_archived else 'Active'
-        table.add_row(
-            str(t_id), question, tags_str, str(resource_count), f'{ago} ago', status
+
+def format_plain_table(
+    title: str, columns: tuple[str, ...], rows: list[tuple[str, ...]]
+) -> str:
+    """Render rows as left-aligned, space-separated columns under a title."""
+    # First pass: measure every column, second pass: emit padded lines
+    widths = [len(column) for column in columns]
+    for row in rows:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+
+    lines = [title]
+    for row in (columns, *rows):
+        lines.append(
+            '  '.join(
+                cell.ljust(width) for cell, width in zip(row, widths, strict=True)
+            ).rstrip()
         )
-    console.print(table)
+    return '\n'.join(lines)
 
 
 def cmd_archive(thread_id: int):
     """Archive a thread."""
-    thread = get_thread_by_id(thread_id)
-    if not thread:
-        console.print(f'[red]Error:[/red] Thread #{thread_id} not found.')
-        return
-
-    # Check if already archived
-    if thread[4]:  # is_archived field
+    archived = archive_thread(thread_id)
+    if archived is None:
+        print_error(f'Thread #{thread_id} not found.')
+    elif not archived:
         console.print(f'[yellow]Thread #{thread_id} is already archived.[/yellow]')
-        return
-
-    success = archive_thread(thread_id)
-    if success:
-        console.print(f'[green]Thread #{thread_id} has been archived.[/green]')
     else:
-        console.print(f'[red]Error:[/red] Could not archive thread #{thread_id}.')
+        console.print(f'[green]Thread #{thread_id} has been archived.[/green]')
 
 
 def cmd_unarchive(thread_id: int):
     """Unarchive a thread."""
-    thread = get_thread_by_id(thread_id)
-    if not thread:
-        console.print(f'[red]Error:[/red] Thread #{thread_id} not found.')
-        return
-
-    # Check if already active
-    if not thread[4]:  # is_archived field
+    unarchived = unarchive_thread(thread_id)
+    if unarchived is None:
+        print_error(f'Thread #{thread_id} not found.')
+    elif not unarchived:
         console.print(
             f'[yellow]Thread #{thread_id} is already active (not archived).[/yellow]'
         )
-        return
-
-    success = unarchive_thread(thread_id)
-    if success:
-        console.print(f'[green]Thread #{thread_id} has been unarchived.[/green]')
     else:
-        console.print(f'[red]Error:[/red] Could not unarchive thread #{thread_id}.')
+        console.print(f'[green]Thread #{thread_id} has been unarchived.[/green]')
 
 
 def cmd_view(thread_id: int):
-    thread_data = get_thread_by_id(thread_id)
-    if not thread_data:
-        console.print(f'[red]Error:[/red] Thread #{thread_id} not found.')
+    view = load_thread_view(thread_id)
+    if not view:
+        print_error(f'Thread #{thread_id} not found.')
         return
 
-    t_id, t_question, t_created, t_last_active, t_is_archived = thread_data
-    # Mark thread as viewed -> update last_active
-    update_thread_last_active(t_id)
-
-    resources = get_resources_for_thread(t_id)
-    tags = get_tags_for_thread(t_id)
-
-    status = '[yellow]ARCHIVED[/yellow]' if t_is_archived else ''
-    console.print(f'[blue bold]Thread #{t_id}[/blue bold]: "{t_question}" {status}')
-    if tags:
-        console.print(f'[yellow]Tags:[/yellow] {", ".join(tags)}')
-    console.print(f'Created: [dim]{time.ctime(t_created)}[/dim]')
-    console.print(f'Last Active: [dim]{time.ctime(time.time())} (just updated)[/dim]\n')
-
-    if not resources:
-        console.print('[dim]No resources found for this thread.[/dim]')
-        return
-
-    console.print('[dim]Resources:[/dim]')
-    for idx, (r_id, r_type, r_content, r_added) in enumerate(resources, start=1):
-        console.print(f'  {idx}) [{r_type}] {r_content}')
+    render_thread(*view)
 
 
 def cmd_current(include_archived: bool = False):
     row = get_most_recent_thread(include_archived=include_archived)
-    if not row:
+    view = load_thread_view(row[0]) if row else None
+    if not view:
         msg = (
             'No threads yet.'
             if include_archived
             else 'No active threads. Try --all to include archived threads.'
         )
-        console.print(f'[dim]{msg}[/dim]')
+        console.print(_markup(f'[dim]{msg}[/dim]'))
         return
 
-    t_id, t_question, t_created, t_last_active, t_is_archived = row
-    # mark it viewed -> update last_active
-    update_thread_last_active(t_id)
-    resources = get_resources_for_thread(t_id)
-    tags = get_tags_for_thread(t_id)
+    render_thread(*view)
+
+
+def render_thread(
+    thread: tuple[int, str, float, float, bool],
+    resources: list[tuple[int, str, str, float]],
+    tags: list[str],
+) -> None:
+    """Print a thread's details as shown by `view` and `current`."""
+    from rich.markup import escape
+
+    t_id, t_question, t_created, t_last_active, t_is_archived = thread
 
     status = '[yellow]ARCHIVED[/yellow]' if t_is_archived else ''
-    console.print(f'[blue bold]Thread #{t_id}[/blue bold]: "{t_question}" {status}')
+    console.print(
+        f'[blue bold]Thread #{t_id}[/blue bold]: "{escape(t_question)}" {status}'
+    )
     if tags:
-        console.print(f'[yellow]Tags:[/yellow] {", ".join(tags)}')
-    console.print(f'Created: [dim]{time.ctime(t_created)}[/dim]')
-    console.print(f'Last Active: [dim]{time.ctime(time.time())} (just updated)[/dim]\n')
+        console.print(f'[yellow]Tags:[/yellow] {escape(", ".join(tags))}')
+    console.print(f'Created: [dim]{format_ctime(t_created)}[/dim]')
+    console.print(f'Last Active: [dim]{format_ctime(t_last_active)} (just updated)[/dim]\n')
 
     if not resources:
-        console.print('[dim]No resources found for this thread.[/dim]')
+        console.print(_markup('[dim]No resources found for this thread.[/dim]'))
         return
 
-    console.print('[dim]Resources:[/dim]')
+    console.print(_markup('[dim]Resources:[/dim]'))
     for idx, (r_id, r_type, r_content, r_added) in enumerate(resources, start=1):
-        console.print(f'  {idx}) [{r_type}] {r_content}')
+        console.print(f'  {idx}) [{r_type}] {r_content}', markup=False)
+
+
+# Text resources ending in these are wrapped in a code fence on export
+CODE_EXTENSIONS = ('.py', '.js', '.ts', '.java', '.c', '.cpp', '.html', '.css', '.sh')
 
 
 def cmd_export(thread_id: int) -> None:
     """Export a thread to clipboard in a formatted way."""
     thread_data = get_thread_by_id(thread_id)
     if not thread_data:
-        console.print(f'[red]Error:[/red] Thread #{thread_id} not found.')
+        print_error(f'Thread #{thread_id} not found.')
         return
 
     t_id, t_question, t_created, t_last_active, t_is_archived = thread_data
@@ -383,58 +489,83 @@ def cmd_export(thread_id: int) -> None:
 
     # Format the thread data into a pretty string
     status = 'ARCHIVED' if t_is_archived else 'ACTIVE'
-    timestamp = time.ctime(t_created)
+    timestamp = format_ctime(t_created)
 
-    # Build the export string
-    export_lines = [
-        f'# Thread #{t_id}: {t_question}',
-        f'Status: {status}',
-        f'Created: {timestamp}',
-    ]
+    # Build the export string in one buffer; every piece after the first
+    # starts with its own separating newline
+    buf = io.StringIO()
+    write = buf.write
+    write(f'# Thread #{t_id}: {t_question}\nStatus: {status}\nCreated: {timestamp}')
 
     if tags:
-        export_lines.append(f'Tags: {", ".join(tags)}')
+        write(f'\nTags: {", ".join(tags)}')
 
     if resources:
-        export_lines.append('\n## Resources:')
+        write('\n\n## Resources:')
         for idx, (r_id, r_type, r_content, r_added) in enumerate(resources, start=1):
-            r_time = time.ctime(r_added)
-            export_lines.append(f'### {idx}. [{r_type.upper()}] - {r_time}')
+            r_time = format_ctime(r_added)
+            r_type = r_type.upper()
+            write(f'\n### {idx}. [{r_type}] - {r_time}\n')
             # Add triple backticks for code files
-            code_extensions = ('.py', '.js', '.ts', '.java', '.c', '.cpp', '.html', '.css', '.sh')
-            if r_type.upper() == "TEXT" and r_content.endswith(code_extensions):
-                export_lines.append(f'```\n{r_content}\n```\n')
+            if r_type == 'TEXT' and r_content.endswith(CODE_EXTENSIONS):
+                write(f'```\n{r_content}\n```\n')
             else:
-                export_lines.append(f'{r_content}\n')
+                write(f'{r_content}\n')
 
-    # Join all lines with newlines
-    export_content = '\n'.join(export_lines)
+    export_content = buf.getvalue()
 
     # Copy to clipboard
+    import pyperclip
+
     pyperclip.copy(export_content)
 
     # Inform the user
     console.print(f'[green]Thread #{t_id} has been exported to clipboard.[/green]')
-    console.print('[dim]Preview:[/dim]')
-    console.print(export_content)
+    console.print(_markup('[dim]Preview:[/dim]'))
+    console.print(export_content, markup=False)
+
+
+def format_ctime(timestamp: float) -> str:
+    """Format a timestamp like time.ctime(), caching by whole second."""
+    return _ctime(int(timestamp))
+
+
+@lru_cache(maxsize=256)
+def _ctime(seconds: int) -> str:
+    return time.ctime(seconds)
+
+
+# Leading whitespace, then an http:// or https:// scheme in any case. The scheme
+# is matched ASCII-only so e.g. 'httpſ://' (long s) is not taken for 'https://'.
+_URL_PREFIX = re.compile(r'\s*(?a:https?://)', re.IGNORECASE)
 
 
 def guess_resource_type(content: str) -> str:
     # Very minimal check for URL or text
-    # In v0.1: "url" if starts with http/https, else "text"
-    if content.strip().lower().startswith('http'):
-        return 'url'
-    return 'text'
-
-
-def time_since(timestamp: float) -> str:
-    """Return a short string like '2m', '3h' or '1d' representing time since `timestamp`."""
-    diff = time.time() - timestamp
-    if diff < 60:
-        return f'{int(diff)}s'
-    elif diff < 3600:
-        return f'{int(diff // 60)}m'
-    elif diff < 86400:
-        return f'{int(diff // 3600)}h'
-    else:
-        return f'{int(diff // 86400)}d'
+    # In v0.1: "url" if starts with http:// or https://, else "text"
+    # The anchored match stops after the prefix, so large clipboard pastes
+    # are neither copied nor scanned
+    return 'url' if _URL_PREFIX.match(content) else 'text'
+
+
+_MIN = 60
+_HOUR = 60 * _MIN
+_DAY = 24 * _HOUR
+
+# Bucket boundaries for time_since; _TIME_UNITS[i] is the (divisor, suffix)
+# for diffs that bisect to index i
+_TIME_BOUNDS = (_MIN, _HOUR, _DAY)
+_TIME_UNITS = ((1, 's'), (_MIN, 'm'), (_HOUR, 'h'), (_DAY, 'd'))
+
+
+def time_since(timestamp: float, now: float | None = None) -> str:
+    """Return a short string like '2m', '3h' or '1d' representing time since `timestamp`.
+    Pass `now` when formatting many rows so the clock is read only once.
+    """
+    return _time_since_delta(int((time.time() if now is None else now) - timestamp))
+
+
+@lru_cache(maxsize=4096)
+def _time_since_delta(seconds: int) -> str:
+    divisor, suffix = _TIME_UNITS[bisect_right(_TIME_BOUNDS, seconds)]
+    return f'{seconds // divisor}{suffix}'
@@ -1,16 +1,63 @@
+import atexit
 import os
-import shutil
 import sqlite3
 import time
+from collections.abc import Generator
+from contextlib import closing, contextmanager
 from datetime import datetime
+from functools import lru_cache
+
+
+__all__ = [
+    'BACKUP_INTERVAL',
+    'DEFAULT_BACKUP_DIR',
+    'DEFAULT_DB_PATH',
+    'SCHEMA_VERSION',
+    'add_tag',
+    'add_tags',
+    'archive_thread',
+    'attach_resource',
+    'backup_database',
+    'backup_database_if_due',
+    'close_connections',
+    'create_thread',
+    'create_threads',
+    'ensure_db_exists',
+    'get_connection',
+    'get_last_n_threads',
+    'get_most_recent_thread',
+    'get_resources_for_thread',
+    'get_tags_for_thread',
+    'get_thread_by_id',
+    'list_threads',
+    'list_threads_with_tags',
+    'load_thread_view',
+    'transaction',
+    'unarchive_thread',
+    'update_thread_last_active',
+]
 
 
 DEFAULT_DB_PATH = os.path.expanduser('~/.config/threads/threads.db')
 DEFAULT_BACKUP_DIR = os.path.expanduser('~/.config/threads/backups')
 
 
+# Clock for stored timestamps; tests swap it for a deterministic one
+_now = time.time
+
+
+# Version of the newest migration; stored in PRAGMA user_version
+SCHEMA_VERSION = 4
+
+
 def _get_db_version(cursor: sqlite3.Cursor) -> int:
     """Get the current database version."""
+    cursor.execute('PRAGMA user_version')
+    return cursor.fetchone()[0]
+
+
+def _get_legacy_db_version(cursor: sqlite3.Cursor) -> int:
+    """Get the version from the schema_version table used by older databases."""
     try:
         cursor.execute('SELECT version FROM schema_version')
         return cursor.fetchone()[0]
@@ -20,21 +67,12 @@ def _get_db_version(cursor: sqlite3.Cursor) -> int:
 
 def _set_db_version(cursor: sqlite3.Cursor, version: int) -> None:
     """Set the database version."""
-    cursor.execute(
-        'INSERT OR REPLACE INTO schema_version (id, version) VALUES (1, ?)', (version,)
-    )
+    # PRAGMA values can't be bound as parameters
+    cursor.execute(f'PRAGMA user_version = {int(version)}')
 
 
 def _run_migration_1(cursor: sqlite3.Cursor) -> None:
     """Add tags support"""
-    # Create schema_version table if it doesn't exist
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS schema_version (
-        id INTEGER PRIMARY KEY CHECK (id = 1),
-        version INTEGER NOT NULL
-    )
-    """)
-
     # Create tags table
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS tags (
@@ -59,6 +97,113 @@ def _run_migration_2(cursor: sqlite3.Cursor) -> None:
     _set_db_version(cursor, 2)
 
 
+def _run_migration_3(cursor: sqlite3.Cursor) -> None:
+    """Touch a thread's last_active whenever a resource is attached"""
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS resources_touch_thread
+    AFTER INSERT ON resources
+    BEGIN
+        UPDATE threads SET last_active = NEW.added_at WHERE id = NEW.thread_id;
+    END
+    """)
+    _set_db_version(cursor, 3)
+
+
+def _run_migration_4(cursor: sqlite3.Cursor) -> None:
+    """Index the columns used to list threads and load their resources"""
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_threads_active_lastactive
+    ON threads(is_archived, last_active DESC)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_resources_thread
+    ON resources(thread_id, added_at)
+    """)
+    # tags already has an index on (thread_id, name) from its UNIQUE constraint
+    _set_db_version(cursor, 4)
+
+
+# The full current schema, equivalent to running every migration. Brand-new
+# databases get it in a single executescript call. It takes the write lock and
+# every statement is IF NOT EXISTS, so two processes creating the same new
+# database at once both succeed.
+_SCHEMA_SQL = f"""
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS threads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_active REAL NOT NULL,
+    is_archived INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS resources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thread_id INTEGER NOT NULL,
+    type TEXT NOT NULL,     -- e.g. 'url' or 'text'
+    content TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    FOREIGN KEY(thread_id) REFERENCES threads(id)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thread_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    FOREIGN KEY(thread_id) REFERENCES threads(id),
+    UNIQUE(thread_id, name)
+);
+CREATE TRIGGER IF NOT EXISTS resources_touch_thread
+AFTER INSERT ON resources
+BEGIN
+    UPDATE threads SET last_active = NEW.added_at WHERE id = NEW.thread_id;
+END;
+CREATE INDEX IF NOT EXISTS idx_threads_active_lastactive ON threads(is_archived, last_active DESC);
+CREATE INDEX IF NOT EXISTS idx_resources_thread ON resources(thread_id, added_at);
+PRAGMA user_version = {SCHEMA_VERSION};
+COMMIT;
+"""
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    """Create or migrate the schema through a newly opened connection."""
+    cursor = conn.cursor()
+    version = _get_db_version(cursor)
+    # Up-to-date databases stop at this single PRAGMA read
+    if version >= SCHEMA_VERSION:
+        return
+
+    if version == 0:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'threads'")
+        if cursor.fetchone() is None:
+            conn.executescript(_SCHEMA_SQL)
+            return
+
+    # Another process may have migrated the database since the read above;
+    # take the write lock first and read the version again under it
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Databases from before user_version was used keep it in a table
+        version = _get_db_version(cursor) or _get_legacy_db_version(cursor)
+        if version < 1:
+            _run_migration_1(cursor)
+        if version < 2:
+            _run_migration_2(cursor)
+        if version < 3:
+            _run_migration_3(cursor)
+        if version < 4:
+            _run_migration_4(cursor)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# Minimum time between automatic backups, in seconds
+BACKUP_INTERVAL = 24 * 60 * 60
+# Marker file whose mtime records the last automatic backup
+_BACKUP_MARKER = '.last'
+
+
 def backup_database(
     db_path: str = DEFAULT_DB_PATH, backup_dir: str = DEFAULT_BACKUP_DIR
 ) -> str:
@@ -76,82 +221,221 @@ def backup_database(
         backup_filename = f'{os.path.splitext(db_filename)[0]}_{timestamp}.db'
         backup_path = os.path.join(backup_dir, backup_filename)
 
-        # Copy database file to backup location
+        # Use SQLite's online backup API rather than copying the file, so the
+        # backup is consistent even while the database is in use
         if os.path.exists(db_path):
-            shutil.copy2(db_path, backup_path)
+            with (
+                closing(sqlite3.connect(db_path)) as src,
+                closing(sqlite3.connect(backup_path)) as dst,
+            ):
+                src.backup(dst)
             return backup_path
-    except (PermissionError, OSError):
+    except (PermissionError, OSError, sqlite3.Error):
         # Log error or simply continue without backup on permission issues
         pass
     return ''
 
 
+def backup_database_if_due(db_path: str = DEFAULT_DB_PATH) -> str:
+    """
+    Back up the database unless the last automatic backup is less than
+    BACKUP_INTERVAL old. Backups go to a 'backups' directory next to the database.
+    Returns the path to the backup file or empty string if no backup was made.
+    """
+    backup_dir = os.path.join(os.path.dirname(db_path), 'backups')
+    marker = os.path.join(backup_dir, _BACKUP_MARKER)
+    try:
+        if time.time() - os.path.getmtime(marker) < BACKUP_INTERVAL:
+            return ''
+    except OSError:
+        # No marker yet: never backed up
+        pass
+
+    backup_path = backup_database(db_path, backup_dir)
+    if backup_path:
+        with open(marker, 'w'):
+            pass
+    return backup_path
+
+
+# Bytes of the database file to memory-map for reads
+_MMAP_SIZE = 64 * 1024 * 1024
+
+# One connection per database path, reused for the life of the process
+_connections: dict[str, sqlite3.Connection] = {}
+# Database paths this process has already considered backing up
+_backup_checked: set[str] = set()
+
+
+def get_connection(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """
+    Return the shared connection for db_path, opening it on first use.
+    Opening it creates or migrates the schema, so that happens once per process.
+    The connection is in autocommit mode; group writes with transaction().
+    db_path may also be a 'file:' URI, e.g. for an in-memory database.
+    """
+    conn = _connections.get(db_path)
+    if conn is None:
+        if not db_path.startswith('file:'):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # The connection is shared by the whole process, so let any thread use
+        # it. SQLite builds in serialized mode (sqlite3.threadsafety == 3)
+        # make that safe; transactions are still per connection, not per thread.
+        conn = sqlite3.connect(
+            db_path, isolation_level=None, uri=True, check_same_thread=False
+        )
+        # WAL appends commits to a log instead of rewriting the database, and
+        # with synchronous=NORMAL it only fsyncs at checkpoints. A commit can
+        # then only be lost to an OS crash or power loss, never a process crash.
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        # Temporary tables and indices (e.g. for sorting) live in memory, not files
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute(f'PRAGMA mmap_size = {_MMAP_SIZE}')
+        try:
+            _ensure_schema(conn)
+        except BaseException:
+            conn.close()
+            raise
+        _connections[db_path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(
+    db_path: str = DEFAULT_DB_PATH,
+) -> Generator[sqlite3.Connection, None, None]:
+    """
+    Run the enclosed statements in a single transaction on the shared connection.
+    Nested transactions join the outermost one, so wrapping a whole command
+    makes all of its writes commit (or roll back) together.
+    Every write goes through here, so entering also drops cached reads.
+    """
+    conn = get_connection(db_path)
+    # Anything read before this point may be about to change
+    _clear_read_caches()
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        # Reads made inside the transaction may have seen rolled back writes
+        _clear_read_caches()
+        raise
+    conn.commit()
+
+
+def _clear_read_caches() -> None:
+    """Drop cached get_thread_by_id/get_tags_for_thread results."""
+    _get_thread_by_id.cache_clear()
+    _get_tags_for_thread.cache_clear()
+
+
+def close_connections(db_path: str | None = None) -> None:
+    """
+    Close the shared connection for db_path, or every shared connection if
+    db_path is None. Registered to run at interpreter exit.
+    """
+    paths = list(_connections) if db_path is None else [db_path]
+    for path in paths:
+        conn = _connections.pop(path, None)
+        if conn is not None:
+            conn.close()
+        _backup_checked.discard(path)
+    _clear_read_caches()
+
+
+atexit.register(close_connections)
+
+
 def ensure_db_exists(
     db_path: str = DEFAULT_DB_PATH, create_backup: bool = False
 ) -> None:
     """
     Ensure the SQLite database and tables exist, creating if necessary.
-    Only create backup when create_backup=True (for write operations).
+    The schema is only checked when the shared connection is opened.
+    When create_backup=True (for write operations), back up an existing database
+    at most once per process and once per BACKUP_INTERVAL.
     """
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-    # Create a backup if the database already exists and backup was requested
-    if create_backup and os.path.exists(db_path):
-        backup_database(db_path)
+    if create_backup and db_path not in _backup_checked:
+        _backup_checked.add(db_path)
+        if os.path.exists(db_path):
+            backup_database_if_due(db_path)
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    get_connection(db_path)
 
-    # Create threads table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS threads (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        question TEXT NOT NULL,
-        created_at REAL NOT NULL,
-        last_active REAL NOT NULL
-    )
-    """)
 
-    # Create resources table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS resources (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        thread_id INTEGER NOT NULL,
-        type TEXT NOT NULL,     -- e.g. 'url' or 'text'
-        content TEXT NOT NULL,
-        added_at REAL NOT NULL,
-        FOREIGN KEY(thread_id) REFERENCES threads(id)
-    )
-    """)
+def _read_cursor(db_path: str) -> sqlite3.Cursor:
+    """Return a cursor on the shared connection, after the schema check."""
+    ensure_db_exists(db_path)
+    return get_connection(db_path).cursor()
 
-    # Run migrations if needed
-    version = _get_db_version(cursor)
-    if version < 1:
-        _run_migration_1(cursor)
-    if version < 2:
-        _run_migration_2(cursor)
 
-    conn.commit()
-    conn.close()
+@contextmanager
+def _write_transaction(db_path: str) -> Generator[sqlite3.Connection, None, None]:
+    """transaction() for writes: schema check and due backup first."""
+    ensure_db_exists(db_path, create_backup=True)
+    with transaction(db_path) as conn:
+        yield conn
+
+
+# Hot statements as constants: sqlite3 caches prepared statements per
+# connection by SQL text, so every call site reuses the same prepared statement.
+_SQL_SELECT_THREAD = """
+SELECT id, question, created_at, last_active, is_archived
+FROM threads
+WHERE id = ?
+"""
+_SQL_SELECT_RESOURCES = """
+SELECT id, type, content, added_at
+FROM resources
+WHERE thread_id = ?
+ORDER BY added_at ASC
+"""
+_SQL_SELECT_TAGS = """
+SELECT name FROM tags
+WHERE thread_id = ?
+ORDER BY name ASC
+"""
+_SQL_TOUCH_THREAD = 'UPDATE threads SET last_active = ? WHERE id = ?'
 
 
 def create_thread(question: str, db_path: str = DEFAULT_DB_PATH) -> int:
     """Create a new thread with a given question. Returns the new thread's ID."""
-    ensure_db_exists(db_path, create_backup=True)
-    timestamp = time.time()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-    INSERT INTO threads (question, created_at, last_active)
-    VALUES (?, ?, ?)
-    """,
-        (question, timestamp, timestamp),
-    )
-    thread_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return thread_id
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+        INSERT INTO threads (question, created_at, last_active)
+        VALUES (?, ?, ?)
+        """,
+            (question, timestamp, timestamp),
+        )
+    return cursor.lastrowid
+
+
+def create_threads(questions: list[str], db_path: str = DEFAULT_DB_PATH) -> None:
+    """
+    Create a thread for each question with one executemany.
+    Threads are stamped in order, so later questions count as more recent.
+    """
+    rows = []
+    for question in questions:
+        timestamp = _now()
+        rows.append((question, timestamp, timestamp))
+    with _write_transaction(db_path) as conn:
+        conn.executemany(
+            """
+        INSERT INTO threads (question, created_at, last_active)
+        VALUES (?, ?, ?)
+        """,
+            rows,
+        )
 
 
 def list_threads(
@@ -162,9 +446,7 @@ def list_threads(
     Limited by `limit`, sorted by last_active desc.
     By default, only non-archived threads are included unless include_archived is True.
     """
-    ensure_db_exists(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _read_cursor(db_path)
 
     # Only include active threads unless include_archived is True
     where_clause = '' if include_archived else 'WHERE t.is_archived = 0'
@@ -172,8 +454,8 @@ def list_threads(
     cursor.execute(
         f"""
     SELECT t.id, t.question,
-           (SELECT COUNT(*) FROM resources r WHERE r.thread_id = t.id) as resource_count,
-           t.last_active, t.is_archived
+        (SELECT COUNT(*) FROM resources WHERE thread_id = t.id),
+        t.last_active, t.is_archived
     FROM threads t
     {where_clause}
     ORDER BY t.last_active DESC
@@ -182,30 +464,64 @@ def list_threads(
         (limit,),
     )
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
 
+# Separator for tag names packed by GROUP_CONCAT (ASCII unit separator,
+# so tag names may contain commas)
+_TAG_SEP = '\x1f'
+
+
+def list_threads_with_tags(
+    db_path: str = DEFAULT_DB_PATH, limit: int = 10, include_archived: bool = False
+) -> list[tuple[int, str, int, float, bool, list[str]]]:
+    """
+    Like list_threads, but each entry also carries the thread's tags (sorted by name):
+    (thread_id, question, resource_count, last_active, is_archived, tags).
+    Counts and tags come from correlated subqueries in the same query, so this is a
+    single round-trip that only looks at the resources and tags of returned threads.
+    """
+    cursor = _read_cursor(db_path)
+
+    # Only include active threads unless include_archived is True
+    where_clause = '' if include_archived else 'WHERE t.is_archived = 0'
+
+    cursor.execute(
+        f"""
+    SELECT t.id, t.question,
+        (SELECT COUNT(*) FROM resources WHERE thread_id = t.id),
+        t.last_active, t.is_archived,
+        (SELECT GROUP_CONCAT(name, ?)
+         FROM (SELECT name FROM tags WHERE thread_id = t.id ORDER BY name))
+    FROM threads t
+    {where_clause}
+    ORDER BY t.last_active DESC
+    LIMIT ?
+    """,
+        (_TAG_SEP, limit),
+    )
+    return [
+        (*row[:5], row[5].split(_TAG_SEP) if row[5] else [])
+        for row in cursor.fetchall()
+    ]
+
+
 def get_thread_by_id(
     thread_id: int, db_path: str = DEFAULT_DB_PATH
 ) -> tuple[int, str, float, float, bool] | None:
     """
     Returns (id, question, created_at, last_active, is_archived) for a thread, or None if not found.
     """
-    ensure_db_exists(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-    SELECT id, question, created_at, last_active, is_archived
-    FROM threads
-    WHERE id = ?
-    """,
-        (thread_id,),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return row
+    return _get_thread_by_id(thread_id, db_path)
+
+
+@lru_cache(maxsize=128)
+def _get_thread_by_id(
+    thread_id: int, db_path: str
+) -> tuple[int, str, float, float, bool] | None:
+    cursor = _read_cursor(db_path)
+    cursor.execute(_SQL_SELECT_THREAD, (thread_id,))
+    return cursor.fetchone()
 
 
 def get_most_recent_thread(
@@ -216,14 +532,21 @@ def get_most_recent_thread(
     Return the single most recently active thread (or None if no threads).
     By default, only considers non-archived threads unless include_archived is True.
     """
-    threads = list_threads(db_path=db_path, limit=1, include_archived=include_archived)
-    if not threads:
-        return None
-    # threads[i] is (thread_id, question, resource_count, last_active, is_archived)
-    # We want (id, question, created_at, last_active, is_archived) from get_thread_by_id,
-    # so let's do extra query:
-    t_id = threads[0][0]
-    return get_thread_by_id(t_id, db_path)
+    cursor = _read_cursor(db_path)
+
+    # Only include active threads unless include_archived is True
+    where_clause = '' if include_archived else 'WHERE is_archived = 0'
+
+    cursor.execute(
+        f"""
+    SELECT id, question, created_at, last_active, is_archived
+    FROM threads
+    {where_clause}
+    ORDER BY last_active DESC
+    LIMIT 1
+    """
+    )
+    return cursor.fetchone()
 
 
 def get_last_n_threads(
@@ -234,9 +557,7 @@ def get_last_n_threads(
     Each entry is (id, question, last_active, is_archived).
     By default, only returns non-archived threads unless include_archived is True.
     """
-    ensure_db_exists(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    cursor = _read_cursor(db_path)
 
     # Only include active threads unless include_archived is True
     where_clause = '' if include_archived else 'WHERE t.is_archived = 0'
@@ -252,7 +573,6 @@ def get_last_n_threads(
         (n,),
     )
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
 
@@ -262,27 +582,16 @@ def attach_resource(
     """
     Attaches a resource to a thread and updates the thread's last_active.
     """
-    ensure_db_exists(db_path, create_backup=True)
-    timestamp = time.time()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    # Insert resource
-    cursor.execute(
-        """
-    INSERT INTO resources (thread_id, type, content, added_at)
-    VALUES (?, ?, ?, ?)
-    """,
-        (thread_id, resource_type, content, timestamp),
-    )
-    # Update last_active
-    cursor.execute(
-        """
-    UPDATE threads SET last_active = ? WHERE id = ?
-    """,
-        (timestamp, thread_id),
-    )
-    conn.commit()
-    conn.close()
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        # The resources_touch_thread trigger updates last_active
+        conn.execute(
+            """
+        INSERT INTO resources (thread_id, type, content, added_at)
+        VALUES (?, ?, ?, ?)
+        """,
+            (thread_id, resource_type, content, timestamp),
+        )
 
 
 def get_resources_for_thread(
@@ -292,122 +601,143 @@ def get_resources_for_thread(
     Returns a list of resources for the given thread, sorted by added_at ascending.
     Each row is (resource_id, type, content, added_at).
     """
-    ensure_db_exists(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-    SELECT id, type, content, added_at
-    FROM resources
-    WHERE thread_id = ?
-    ORDER BY added_at ASC
-    """,
-        (thread_id,),
-    )
+    cursor = _read_cursor(db_path)
+    cursor.execute(_SQL_SELECT_RESOURCES, (thread_id,))
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
 
+def load_thread_view(
+    thread_id: int, db_path: str = DEFAULT_DB_PATH
+) -> (
+    tuple[
+        tuple[int, str, float, float, bool],
+        list[tuple[int, str, str, float]],
+        list[str],
+    ]
+    | None
+):
+    """
+    Mark a thread as viewed and load everything needed to display it,
+    using one connection and one transaction.
+    Returns (thread, resources, tags) with the same row shapes as get_thread_by_id,
+    get_resources_for_thread and get_tags_for_thread, or None if the thread is not found.
+    """
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        cursor = conn.cursor()
+        # No UPDATE ... RETURNING: that needs SQLite 3.35+, so touch, then read
+        cursor.execute(_SQL_TOUCH_THREAD, (timestamp, thread_id))
+        if cursor.rowcount == 0:
+            return None
+
+        # The thread's tags come back in the same row
+        cursor.execute(
+            """
+        SELECT id, question, created_at, last_active, is_archived, (
+            SELECT GROUP_CONCAT(name, ?)
+            FROM (SELECT name FROM tags WHERE thread_id = threads.id ORDER BY name)
+        )
+        FROM threads
+        WHERE id = ?
+        """,
+            (_TAG_SEP, thread_id),
+        )
+        row = cursor.fetchone()
+
+        cursor.execute(_SQL_SELECT_RESOURCES, (thread_id,))
+        resources = cursor.fetchall()
+    return row[:5], resources, row[5].split(_TAG_SEP) if row[5] else []
+
+
 def update_thread_last_active(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> None:
     """
     Updates the thread's last_active time (used e.g. when viewing).
     """
-    ensure_db_exists(db_path, create_backup=True)
-    timestamp = time.time()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-    UPDATE threads SET last_active = ? WHERE id = ?
-    """,
-        (timestamp, thread_id),
-    )
-    conn.commit()
-    conn.close()
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        conn.execute(_SQL_TOUCH_THREAD, (timestamp, thread_id))
 
 
 def add_tag(thread_id: int, tag_name: str, db_path: str = DEFAULT_DB_PATH) -> None:
     """Add a tag to a thread."""
-    ensure_db_exists(db_path, create_backup=True)
-    timestamp = time.time()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        # A tag the thread already has is skipped by the UNIQUE constraint
+        conn.execute(
             """
-        INSERT INTO tags (thread_id, name, created_at)
+        INSERT OR IGNORE INTO tags (thread_id, name, created_at)
         VALUES (?, ?, ?)
         """,
             (thread_id, tag_name, timestamp),
         )
-        conn.commit()
-    except sqlite3.IntegrityError:
-        # Tag already exists for this thread, ignore
-        pass
-    finally:
-        conn.close()
+
+
+def add_tags(
+    thread_id: int, tag_names: list[str], db_path: str = DEFAULT_DB_PATH
+) -> None:
+    """Add several tags to a thread in one statement, skipping ones it already has."""
+    timestamp = _now()
+    with _write_transaction(db_path) as conn:
+        conn.executemany(
+            """
+        INSERT OR IGNORE INTO tags (thread_id, name, created_at)
+        VALUES (?, ?, ?)
+        """,
+            [(thread_id, name, timestamp) for name in tag_names],
+        )
 
 
 def get_tags_for_thread(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> list[str]:
     """Get all tags for a thread."""
-    ensure_db_exists(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-    SELECT name FROM tags
-    WHERE thread_id = ?
-    ORDER BY name ASC
-    """,
-        (thread_id,),
-    )
-    tags = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return tags
+    # Callers get their own list; the cache holds an immutable tuple
+    return list(_get_tags_for_thread(thread_id, db_path))
+
 
+@lru_cache(maxsize=128)
+def _get_tags_for_thread(thread_id: int, db_path: str) -> tuple[str, ...]:
+    cursor = _read_cursor(db_path)
+    cursor.execute(_SQL_SELECT_TAGS, (thread_id,))
+    return tuple(row[0] for row in cursor.fetchall())
 
-def archive_thread(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> bool:
+
+def _set_archived(thread_id: int, archived: bool, db_path: str) -> bool | None:
     """
-    Mark a thread as archived.
-    Returns True if thread was found and archived, False otherwise.
+    Set a thread's is_archived flag.
+    Returns True if the flag changed, False if it already had that value,
+    or None if the thread does not exist.
     """
-    ensure_db_exists(db_path, create_backup=True)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Mark thread as archived
-    cursor.execute(
-        """
-    UPDATE threads SET is_archived = 1 WHERE id = ?
-    """,
-        (thread_id,),
-    )
+    with _write_transaction(db_path) as conn:
+        cursor = conn.cursor()
+        # Only touch the row if it is in the other state, so a single UPDATE
+        # covers the common case
+        cursor.execute(
+            """
+        UPDATE threads SET is_archived = ? WHERE id = ? AND is_archived = ?
+        """,
+            (int(archived), thread_id, int(not archived)),
+        )
+        if cursor.rowcount > 0:
+            return True
 
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+        # Nothing changed: tell "already in that state" apart from "missing"
+        cursor.execute('SELECT 1 FROM threads WHERE id = ?', (thread_id,))
+        return False if cursor.fetchone() else None
 
 
-def unarchive_thread(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> bool:
+def archive_thread(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> bool | None:
     """
-    Mark a thread as not archived.
-    Returns True if thread was found and unarchived, False otherwise.
+    Mark a thread as archived.
+    Returns True if archived, False if it was already archived,
+    or None if the thread was not found.
     """
-    ensure_db_exists(db_path, create_backup=True)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    return _set_archived(thread_id, True, db_path)
 
-    # Mark thread as not archived
-    cursor.execute(
-        """
-    UPDATE threads SET is_archived = 0 WHERE id = ?
-    """,
-        (thread_id,),
-    )
 
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
+def unarchive_thread(thread_id: int, db_path: str = DEFAULT_DB_PATH) -> bool | None:
+    """
+    Mark a thread as not archived.
+    Returns True if unarchived, False if it was not archived,
+    or None if the thread was not found.
+    """
+    return _set_archived(thread_id, False, db_path)
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+# Canned rows in the shapes threads.db returns, built once at import
+TS = 1_700_000_000.0
+THREAD = (42, 'Test Question', TS, TS, False)
+RESOURCES = [
+    (1, 'url', 'https://example.com', TS),
+    (2, 'text', 'Some notes', TS),
+]
+TAGS = ['important', 'research']
+
+
+@pytest.fixture
+def mock_console(monkeypatch):
+    """Replace the CLI's Rich console with a Console-spec'd mock.
+    Only the CLI test modules use it, so the db tests never import Rich.
+    """
+    from rich.console import Console
+
+    console = Mock(spec=Console)
+    monkeypatch.setattr('threads.cli.console', console)
+    return console
+
+
+@pytest.fixture
+def thread_mocks(mocker, mock_console):
+    """Patch the clipboard and db reads threads.cli uses to show a thread.
+    Every read returns the canned thread #42; the stubs are autospec'd, so a
+    call with the wrong arguments fails instead of passing silently.
+    """
+    return SimpleNamespace(
+        console=mock_console,
+        copy=mocker.patch('pyperclip.copy', autospec=True),
+        get_thread_by_id=mocker.patch(
+            'threads.cli.get_thread_by_id',
+            return_value=THREAD,
+            autospec=True,
+        ),
+        get_resources_for_thread=mocker.patch(
+            'threads.cli.get_resources_for_thread',
+            return_value=RESOURCES,
+            autospec=True,
+        ),
+        get_tags_for_thread=mocker.patch(
+            'threads.cli.get_tags_for_thread',
+            return_value=TAGS,
+            autospec=True,
+        ),
+        load_thread_view=mocker.patch(
+            'threads.cli.load_thread_view',
+            return_value=(THREAD, RESOURCES, TAGS),
+            autospec=True,
+        ),
+        thread=THREAD,
+        resources=RESOURCES,
+        tags=TAGS,
+    )
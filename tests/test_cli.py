@@ -1,25 +1,52 @@
+import io
+import subprocess
+import sys
 import time
-from unittest.mock import patch
+
+import pytest
 
 from threads.cli import (
+    HELP_TEXT,
+    cmd_attach,
     cmd_new,
     cmd_view,
+    format_ctime,
+    format_plain_table,
     guess_resource_type,
     parse_args,
+    print_help,
+    render_thread,
     time_since,
 )
 
+# Every test here prints through the CLI's console
+pytestmark = pytest.mark.usefixtures('mock_console')
+
+
+def test_import_is_lazy():
+    """Test importing the CLI loads neither Rich nor pyperclip."""
+    code = (
+        'import sys, threads.cli; '
+        "print(sorted({m.split('.')[0] for m in sys.modules} & {'rich', 'pyperclip'}))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == '[]'
+
 
 def test_parse_args():
     """Test the command line argument parser."""
     # Test basic command
-    command, known_flags, unknown_flags = parse_args(['thread', 'new'])
-    assert command == 'new'
-    assert known_flags == []
-    assert unknown_flags == []
+    parsed = parse_args(['thread', 'new'])
+    assert parsed.command == 'new'
+    assert parsed.positional == []
+    assert not parsed.deep
+    assert not parsed.all_
+    assert parsed.tags == []
 
     # Test with flags
-    command, known_flags, unknown_flags = parse_args([
+    parsed = parse_args([
         'thread',
         'new',
         'My Question',
@@ -27,44 +54,124 @@ def test_parse_args():
         '--tag1',
         '--tag2',
     ])
-    assert command == 'new'
-    assert known_flags == ['--deep']
-    assert unknown_flags == ['tag1', 'tag2']
+    assert parsed.command == 'new'
+    assert parsed.positional == ['My Question']
+    assert parsed.deep
+    assert not parsed.all_
+    assert parsed.tags == ['tag1', 'tag2']
+    assert parsed.all_tags == ['tag1', 'tag2', 'deep']
+
+
+def test_parse_args_thread_id():
+    """Test thread ID validation for commands that take one."""
+    parsed = parse_args(['thread', 'view', '42'])
+    assert parsed.thread_id == 42
+
+    # Commands without an ID leave it unset
+    assert parse_args(['thread', 'new', '42']).thread_id is None
+
+    with pytest.raises(ValueError, match='No thread ID specified'):
+        parse_args(['thread', 'archive'])
+
+    for bad in ('abc', '-3', ' 7', '1_0'):
+        with pytest.raises(ValueError, match='must be an integer'):
+            parse_args(['thread', 'export', bad])
+
+    # attach takes its target from --to, which consumes the next argument
+    parsed = parse_args(['thread', 'attach', 'some', '--to', '7', 'notes', '--x'])
+    assert parsed.thread_id == 7
+    assert parsed.positional == ['some', 'notes']
+    assert parsed.tags == ['x']
 
+    with pytest.raises(ValueError, match='No thread ID specified'):
+        parse_args(['thread', 'attach', 'notes', '--to'])
 
-def test_guess_resource_type():
+    # Other commands treat --to as an ordinary tag
+    parsed = parse_args(['thread', 'new', 'q', '--to', '5'])
+    assert parsed.thread_id is None
+    assert parsed.positional == ['q', '5']
+    assert parsed.tags == ['to']
+
+
+@pytest.mark.parametrize(
+    'content,expected',
+    [
+        ('https://example.com', 'url'),
+        ('http://test.org/page', 'url'),
+        ('  HTTPS://Example.com', 'url'),
+        ('This is just plain text', 'text'),
+        ('Notes about the topic', 'text'),
+        ('httpd config notes', 'text'),
+        ('https:', 'text'),
+        ('httpſ://example.com', 'text'),
+    ],
+)
+def test_guess_resource_type(content, expected):
     """Test resource type detection."""
-    # URL detection
-    assert guess_resource_type('https://example.com') == 'url'
-    assert guess_resource_type('http://test.org/page') == 'url'
+    assert guess_resource_type(content) == expected
 
-    # Text detection
-    assert guess_resource_type('This is just plain text') == 'text'
-    assert guess_resource_type('Notes about the topic') == 'text'
 
+# Fixed reference time for time_since cases
+_NOW = 1_700_000_000.0
 
-def test_time_since():
+
+@pytest.mark.parametrize(
+    'delta,expected',
+    [
+        (30, '30s'),
+        (120, '2m'),
+        (3599, '59m'),
+        (3600, '1h'),
+        (7200, '2h'),
+        (172800, '2d'),
+    ],
+)
+def test_time_since(delta, expected):
     """Test the time formatter."""
+    assert time_since(_NOW - delta, now=_NOW) == expected
+
+
+def test_time_since_default_now():
+    """Test the time formatter reads the clock when no reference time is given."""
+    assert time_since(time.time() - 120) == '2m'
+
+
+def test_format_ctime():
+    """Test the cached ctime formatter matches time.ctime."""
     now = time.time()
+    assert format_ctime(now) == time.ctime(now)
+    assert format_ctime(1_700_000_000.75) == time.ctime(1_700_000_000.75)
 
-    # Test seconds
-    assert time_since(now - 30) == '30s'
 
-    # Test minutes
-    assert time_since(now - 120) == '2m'
+def test_format_plain_table():
+    """Test the plain-text table used when output is piped."""
+    output = format_plain_table(
+        'Threads',
+        ('ID', 'Title'),
+        [('1', 'First question'), ('12', 'Second')],
+    )
+    assert output.splitlines() == [
+        'Threads',
+        'ID  Title',
+        '1   First question',
+        '12  Second',
+    ]
 
-    # Test hours
-    assert time_since(now - 7200) == '2h'
 
-    # Test days
-    assert time_since(now - 172800) == '2d'
+def test_print_help(capsys):
+    """Test help is written as plain text when stdout is not a terminal."""
+    print_help()
+    output = capsys.readouterr().out
+    assert output == HELP_TEXT
+    assert '\x1b[' not in output
+    assert 'thread view [id]' in output
 
 
-@patch('threads.cli.create_thread')
-@patch('threads.cli.console')
-def test_cmd_new(mock_console, mock_create_thread):
+def test_cmd_new(mocker, mock_console):
     """Test the new thread command."""
-    mock_create_thread.return_value = 42
+    mock_create_thread = mocker.patch(
+        'threads.cli.create_thread', return_value=42, autospec=True
+    )
 
     result = cmd_new('Test Question')
 
@@ -79,48 +186,80 @@ def test_cmd_new(mock_console, mock_create_thread):
     assert result == 42
 
 
-@patch('threads.cli.get_thread_by_id')
-@patch('threads.cli.get_resources_for_thread')
-@patch('threads.cli.get_tags_for_thread')
-@patch('threads.cli.update_thread_last_active')
-@patch('threads.cli.console')
-def test_cmd_view(
-    mock_console,
-    mock_update_last_active,
-    mock_get_tags,
-    mock_get_resources,
-    mock_get_thread,
-):
+def test_cmd_view(thread_mocks):
     """Test the view thread command."""
-    # Mock data
-    thread_id = 42
-    mock_get_thread.return_value = (
-        thread_id,
-        'Test Question',
-        time.time(),
-        time.time(),
-        False,
-    )
-    mock_get_tags.return_value = ['important', 'research']
-    mock_get_resources.return_value = [
-        (1, 'url', 'https://example.com', time.time()),
-        (2, 'text', 'Some notes', time.time()),
-    ]
+    thread_id = thread_mocks.thread[0]
 
     # Call function
     cmd_view(thread_id)
 
-    # Verify thread was fetched
-    mock_get_thread.assert_called_once_with(thread_id)
+    # Verify thread, tags and resources were loaded (and touched) in one call
+    thread_mocks.load_thread_view.assert_called_once_with(thread_id)
+
+    # Verify output
+    output = '\n'.join(
+        str(call.args[0]) for call in thread_mocks.console.print.call_args_list
+    )
+    expected = (
+        f'Thread #{thread_id}',
+        'Test Question',
+        'important, research',
+        'https://example.com',
+        'Some notes',
+    )
+    missing = [s for s in expected if s not in output]
+    assert not missing, missing
+
 
-    # Verify last_active was updated
-    mock_update_last_active.assert_called_once_with(thread_id)
+def test_user_text_is_not_markup(mocker, monkeypatch):
+    """Test brackets in questions and tags are printed, not parsed as markup."""
+    from rich.console import Console
 
-    # Verify tags were fetched
-    mock_get_tags.assert_called_once_with(thread_id)
+    console = Console(file=io.StringIO(), width=200)
+    monkeypatch.setattr('threads.cli.console', console)
+    mocker.patch('threads.cli.create_thread', return_value=1, autospec=True)
 
-    # Verify resources were fetched
-    mock_get_resources.assert_called_once_with(thread_id)
+    cmd_new('[/x]')
+    render_thread(
+        (1, 'What is [bold]this[/bold]?', _NOW, _NOW, False), [], ['[red]tag']
+    )
 
-    # Verify output
-    assert mock_console.print.call_count >= 5  # Multiple print calls
+    output = console.file.getvalue()
+    expected = ('"[/x]"', 'What is [bold]this[/bold]?', 'Tags: [red]tag')
+    missing = [s for s in expected if s not in output]
+    assert not missing, missing
+
+
+def test_cmd_view_thread_not_found(mocker, mock_console):
+    """Test the view command when thread is not found."""
+    mocker.patch('threads.cli.load_thread_view', return_value=None, autospec=True)
+
+    cmd_view(999)
+
+    mock_console.print.assert_called_once()
+    assert 'Thread #999 not found' in mock_console.print.call_args[0][0]
+
+
+def test_cmd_attach_to_thread(mocker):
+    """Test attaching with an explicit target skips the picker."""
+    mock_get_thread = mocker.patch(
+        'threads.cli.get_thread_by_id',
+        return_value=(7, 'Test Question', _NOW, _NOW, False),
+        autospec=True,
+    )
+    mock_attach_resource = mocker.patch('threads.cli.attach_resource', autospec=True)
+    mock_list_threads = mocker.patch(
+        'threads.cli.list_threads_with_tags', autospec=True
+    )
+
+    result = cmd_attach('https://example.com', thread_id=7)
+
+    assert result == 7
+    mock_attach_resource.assert_called_once_with(7, 'https://example.com', 'url')
+    mock_list_threads.assert_not_called()
+
+    # Unknown target: nothing is attached
+    mock_get_thread.return_value = None
+    mock_attach_resource.reset_mock()
+    assert cmd_attach('notes', thread_id=999) is None
+    mock_attach_resource.assert_not_called()
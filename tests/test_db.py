@@ -1,28 +1,251 @@
+import itertools
+import os
+import sqlite3
+import threading
 import time
+import uuid
 
 import pytest
 
 from threads.db import (
+    _SCHEMA_SQL,
+    BACKUP_INTERVAL,
+    SCHEMA_VERSION,
+    _get_db_version,
     add_tag,
+    add_tags,
     archive_thread,
     attach_resource,
+    close_connections,
     create_thread,
+    create_threads,
+    ensure_db_exists,
+    get_connection,
     get_last_n_threads,
     get_most_recent_thread,
     get_resources_for_thread,
     get_tags_for_thread,
     get_thread_by_id,
     list_threads,
+    list_threads_with_tags,
+    load_thread_view,
+    transaction,
     unarchive_thread,
     update_thread_last_active,
 )
 
 
+class _Rollback(Exception):
+    """Raised to end a test's transaction with a rollback."""
+
+
+@pytest.fixture(scope='session')
+def session_db():
+    """Create one in-memory database, with its schema, for the whole session."""
+    db_path = f'file:threads_test_{uuid.uuid4().hex}?mode=memory&cache=shared'
+    ensure_db_exists(db_path)
+    yield db_path
+    # The in-memory database is freed with its last connection
+    close_connections(db_path)
+
+
+@pytest.fixture
+def test_db(session_db):
+    """
+    Run the test inside a transaction on the session database and roll it back
+    afterwards. Writes made by the test join this transaction, so nothing it
+    does is visible to the next test (AUTOINCREMENT counters included).
+    """
+    try:
+        with transaction(session_db):
+            yield session_db
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
 @pytest.fixture
-def test_db(tmp_path):
-    """Create a test database file."""
-    db_path = tmp_path / 'test_threads.db'
-    return str(db_path)
+def fresh_db():
+    """Create a private in-memory database, for tests that commit or roll back."""
+    db_path = f'file:threads_test_{uuid.uuid4().hex}?mode=memory&cache=shared'
+    yield db_path
+    close_connections(db_path)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Give every timestamp the db module takes a distinct, increasing value."""
+    ticks = itertools.count(1_700_000_000.0)
+    monkeypatch.setattr('threads.db._now', lambda: next(ticks))
+
+
+@pytest.fixture
+def test_db_file(tmp_path):
+    """Create a test database file, for tests that need one on disk."""
+    db_path = str(tmp_path / 'test_threads.db')
+    yield db_path
+    close_connections(db_path)
+
+
+def test_schema_version(test_db):
+    """Test new databases record their schema version in user_version."""
+    create_thread('Test Question', db_path=test_db)
+    conn = get_connection(test_db)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+
+
+def test_list_and_resource_queries_use_indexes(test_db):
+    """Test the hot list/view queries search an index instead of scanning."""
+    create_thread('Test Question', db_path=test_db)
+    conn = get_connection(test_db)
+    plans = [
+        conn.execute(f'EXPLAIN QUERY PLAN {sql}', (1,)).fetchall()[0][3]
+        for sql in (
+            (
+                'SELECT id FROM threads WHERE is_archived = 0 '
+                'ORDER BY last_active DESC LIMIT ?'
+            ),
+            'SELECT id FROM resources WHERE thread_id = ? ORDER BY added_at ASC',
+        )
+    ]
+    assert 'INDEX idx_threads_active_lastactive' in plans[0]
+    assert 'INDEX idx_resources_thread' in plans[1]
+
+
+def _schema(conn):
+    """Describe a database's tables, columns, indexes and triggers."""
+    objects = conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' "
+        'ORDER BY name'
+    ).fetchall()
+    columns = {
+        table: conn.execute(f'PRAGMA table_info({table})').fetchall()
+        for kind, table in objects
+        if kind == 'table'
+    }
+    return objects, columns
+
+
+def test_fresh_schema_matches_migrations(test_db, fresh_db):
+    """Test the one-shot schema for new databases equals a fully migrated one."""
+    # The original schema, before any migration
+    keep_alive = sqlite3.connect(fresh_db, uri=True)
+    keep_alive.executescript("""
+    CREATE TABLE threads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_active REAL NOT NULL
+    );
+    CREATE TABLE resources (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        thread_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        added_at REAL NOT NULL,
+        FOREIGN KEY(thread_id) REFERENCES threads(id)
+    );
+    """)
+
+    migrated = get_connection(fresh_db)
+    keep_alive.close()
+    assert _schema(migrated) == _schema(get_connection(test_db))
+
+
+def test_legacy_schema_version(test_db_file):
+    """Test databases versioned by the old schema_version table are not re-migrated."""
+    conn = sqlite3.connect(test_db_file)
+    conn.executescript("""
+    CREATE TABLE threads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_active REAL NOT NULL,
+        is_archived INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE resources (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        thread_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        added_at REAL NOT NULL
+    );
+    CREATE TABLE tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        thread_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        UNIQUE(thread_id, name)
+    );
+    CREATE TABLE schema_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+    INSERT INTO schema_version (id, version) VALUES (1, 2);
+    INSERT INTO threads (question, created_at, last_active) VALUES ('Old', 1.0, 1.0);
+    """)
+    conn.close()
+
+    # Re-running migration 2 would fail on the existing is_archived column
+    threads = list_threads(db_path=test_db_file)
+    assert [t[1] for t in threads] == ['Old']
+
+    # Later migrations still run
+    conn = sqlite3.connect(test_db_file)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_concurrent_first_run(test_db_file, mocker):
+    """Test a process that lost the race to create or migrate the schema is fine."""
+    thread_id = create_thread('Test Question', db_path=test_db_file)
+    close_connections(test_db_file)
+
+    # The schema script can run again over the schema it created
+    conn = sqlite3.connect(test_db_file)
+    conn.executescript(_SCHEMA_SQL)
+    conn.close()
+
+    # A version read before the other process committed is re-read under the lock
+    stale = iter([0])
+    read_version = _get_db_version
+    get_version = mocker.patch(
+        'threads.db._get_db_version',
+        side_effect=lambda cursor: (
+            v if (v := next(stale, None)) is not None else read_version(cursor)
+        ),
+    )
+    assert get_thread_by_id(thread_id, db_path=test_db_file)[1] == 'Test Question'
+    assert get_version.call_count >= 2
+
+
+def test_backup_throttled(test_db_file):
+    """Test automatic backups run at most once per BACKUP_INTERVAL."""
+    backup_dir = os.path.join(os.path.dirname(test_db_file), 'backups')
+    marker = os.path.join(backup_dir, '.last')
+    thread_id = create_thread('Test Question', db_path=test_db_file)
+    # Nothing to back up before the database exists
+    assert not os.path.exists(backup_dir)
+
+    close_connections(test_db_file)
+    add_tag(thread_id, 'first', db_path=test_db_file)
+    (backup,) = [f for f in os.listdir(backup_dir) if f.endswith('.db')]
+    conn = sqlite3.connect(os.path.join(backup_dir, backup))
+    assert conn.execute('SELECT question FROM threads').fetchall() == [
+        ('Test Question',)
+    ]
+    conn.close()
+
+    # A recent backup suppresses the next one
+    recent = time.time() - 60
+    os.utime(marker, (recent, recent))
+    close_connections(test_db_file)
+    add_tag(thread_id, 'second', db_path=test_db_file)
+    assert os.path.getmtime(marker) == recent
+
+    # Once the last backup is old enough, the next process backs up again
+    stale = time.time() - BACKUP_INTERVAL - 1
+    os.utime(marker, (stale, stale))
+    close_connections(test_db_file)
+    add_tag(thread_id, 'third', db_path=test_db_file)
+    assert os.path.getmtime(marker) > stale
 
 
 def test_create_thread(test_db):
@@ -35,6 +258,82 @@ def test_create_thread(test_db):
     assert thread_id == 2
 
 
+def test_transaction_groups_writes(fresh_db):
+    """Test nested writes join an outer transaction and roll back with it."""
+    with transaction(fresh_db):
+        thread_id = create_thread('Kept', db_path=fresh_db)
+        add_tag(thread_id, 'research', db_path=fresh_db)
+    assert get_tags_for_thread(thread_id, db_path=fresh_db) == ['research']
+
+    with pytest.raises(RuntimeError), transaction(fresh_db):
+        create_thread('Discarded', db_path=fresh_db)
+        raise RuntimeError('abort')
+
+    threads = list_threads(db_path=fresh_db)
+    assert [t[1] for t in threads] == ['Kept']
+
+
+def test_read_cache_invalidated_by_writes(fresh_db):
+    """Test cached thread and tag reads never outlive a write."""
+    thread_id = create_thread('Test Question', db_path=fresh_db)
+    add_tag(thread_id, 'research', db_path=fresh_db)
+    thread = get_thread_by_id(thread_id, db_path=fresh_db)
+    assert get_thread_by_id(thread_id, db_path=fresh_db) is thread
+
+    tags = get_tags_for_thread(thread_id, db_path=fresh_db)
+    tags.append('mutated')  # Callers get a copy
+    assert get_tags_for_thread(thread_id, db_path=fresh_db) == ['research']
+
+    archive_thread(thread_id, db_path=fresh_db)
+    add_tag(thread_id, 'important', db_path=fresh_db)
+    assert get_thread_by_id(thread_id, db_path=fresh_db)[4]
+    assert get_tags_for_thread(thread_id, db_path=fresh_db) == ['important', 'research']
+
+    # Reads inside a rolled back transaction are forgotten too
+    with pytest.raises(RuntimeError), transaction(fresh_db):
+        add_tag(thread_id, 'discarded', db_path=fresh_db)
+        assert 'discarded' in get_tags_for_thread(thread_id, db_path=fresh_db)
+        raise RuntimeError('abort')
+    assert get_tags_for_thread(thread_id, db_path=fresh_db) == ['important', 'research']
+
+
+def test_connection_uses_wal(test_db_file):
+    """Test the shared connection switches the database to WAL."""
+    create_thread('Test Question', db_path=test_db_file)
+    conn = sqlite3.connect(test_db_file)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
+
+
+def test_connection_keeps_temp_store_in_memory(test_db):
+    """Test the shared connection sets temp_store to MEMORY (2)."""
+    conn = get_connection(test_db)
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2
+
+
+def test_close_connections(test_db_file, test_db):
+    """Test the shared connection is reopened after being closed."""
+    thread_id = create_thread('Test Question', db_path=test_db_file)
+    close_connections(test_db_file)
+    # Other databases keep their connection
+    assert get_connection(test_db).in_transaction
+
+    thread = get_thread_by_id(thread_id, db_path=test_db_file)
+    assert thread[1] == 'Test Question'
+
+
+def test_connection_shared_across_threads(test_db):
+    """Test the shared connection can be used from another thread."""
+    thread_id = create_thread('Test Question', db_path=test_db)
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.append(get_thread_by_id(thread_id, db_path=test_db))
+    )
+    worker.start()
+    worker.join()
+    assert results[0][1] == 'Test Question'
+
+
 def test_get_thread_by_id(test_db):
     """Test retrieving a thread by ID."""
     thread_id = create_thread('Test Question', db_path=test_db)
@@ -47,7 +346,7 @@ def test_get_thread_by_id(test_db):
     assert isinstance(thread[3], float)  # last_active
 
 
-def test_list_threads(test_db):
+def test_list_threads(test_db, clock):
     """Test listing threads."""
     # Create threads
     thread_id1 = create_thread('Question 1', db_path=test_db)
@@ -60,6 +359,12 @@ def test_list_threads(test_db):
     assert threads[0][0] == thread_id2
     assert threads[1][0] == thread_id1
 
+    # Resource counts, including threads with no resources
+    attach_resource(thread_id1, 'https://example.com', 'url', db_path=test_db)
+    attach_resource(thread_id1, 'Some notes', 'text', db_path=test_db)
+    counts = {t[0]: t[2] for t in list_threads(db_path=test_db)}
+    assert counts == {thread_id1: 2, thread_id2: 0}
+
 
 def test_attach_resource(test_db):
     """Test attaching resources to a thread."""
@@ -82,11 +387,13 @@ def test_attach_resource(test_db):
     assert resources[0][2] == 'https://example.com'
     assert resources[1][2] == 'Some notes about this topic'
 
+    # Attaching touches the thread
+    assert get_thread_by_id(thread_id, db_path=test_db)[3] == resources[1][3]
 
-def test_get_most_recent_thread(test_db):
+
+def test_get_most_recent_thread(test_db, clock):
     """Test getting the most recent thread."""
     thread_id1 = create_thread('Question 1', db_path=test_db)
-    time.sleep(0.1)  # Ensure timestamps are different
     thread_id2 = create_thread('Question 2', db_path=test_db)
 
     recent = get_most_recent_thread(db_path=test_db)
@@ -96,13 +403,40 @@ def test_get_most_recent_thread(test_db):
     # Update first thread
     update_thread_last_active(thread_id1, db_path=test_db)
     recent = get_most_recent_thread(db_path=test_db)
+    assert recent == get_thread_by_id(thread_id1, db_path=test_db)
+
+    # Archived threads are skipped unless requested
+    archive_thread(thread_id1, db_path=test_db)
+    assert get_most_recent_thread(db_path=test_db)[0] == thread_id2
+    recent = get_most_recent_thread(db_path=test_db, include_archived=True)
     assert recent[0] == thread_id1
 
 
-def test_get_last_n_threads(test_db):
+def test_load_thread_view(test_db):
+    """Test loading a thread with its resources and tags in one call."""
+    thread_id = create_thread('Test Question', db_path=test_db)
+    attach_resource(thread_id, 'https://example.com', 'url', db_path=test_db)
+    add_tags(thread_id, ['research', 'a,b', 'deep'], db_path=test_db)
+    before = get_thread_by_id(thread_id, db_path=test_db)
+
+    thread, resources, tags = load_thread_view(thread_id, db_path=test_db)
+    assert thread[:3] == before[:3]
+    assert thread[3] >= before[3]  # last_active was touched
+    assert thread == get_thread_by_id(thread_id, db_path=test_db)
+    assert [r[2] for r in resources] == ['https://example.com']
+    assert tags == get_tags_for_thread(thread_id, db_path=test_db)
+    assert tags == ['a,b', 'deep', 'research']
+
+    # No tags
+    other_id = create_thread('Other Question', db_path=test_db)
+    assert load_thread_view(other_id, db_path=test_db)[1:] == ([], [])
+
+    assert load_thread_view(999, db_path=test_db) is None
+
+
+def test_get_last_n_threads(test_db, clock):
     """Test getting the last N threads."""
-    for i in range(10):
-        create_thread(f'Question {i + 1}', db_path=test_db)
+    create_threads([f'Question {i + 1}' for i in range(10)], db_path=test_db)
 
     # Get last 5 threads
     threads = get_last_n_threads(db_path=test_db, n=5)
@@ -132,6 +466,32 @@ def test_tags(test_db):
     tags = get_tags_for_thread(thread_id, db_path=test_db)
     assert len(tags) == 2  # Still just 2 tags
 
+    # Batch add skips existing and repeated tags
+    add_tags(thread_id, ['research', 'deep', 'deep'], db_path=test_db)
+    tags = get_tags_for_thread(thread_id, db_path=test_db)
+    assert tags == ['deep', 'important', 'research']
+
+
+def test_list_threads_with_tags(test_db):
+    """Test listing threads together with their tags and resource counts."""
+    thread_id1 = create_thread('Question 1', db_path=test_db)
+    thread_id2 = create_thread('Question 2', db_path=test_db)
+
+    add_tag(thread_id1, 'research', db_path=test_db)
+    add_tag(thread_id1, 'a,b', db_path=test_db)
+    attach_resource(thread_id1, 'https://example.com', 'url', db_path=test_db)
+    attach_resource(thread_id1, 'Some notes', 'text', db_path=test_db)
+
+    threads = list_threads_with_tags(db_path=test_db)
+    assert [t[0] for t in threads] == [thread_id1, thread_id2]
+    assert threads[0][2] == 2  # resource_count
+    assert threads[0][5] == ['a,b', 'research']
+    assert threads[1][2] == 0
+    assert threads[1][5] == []
+
+    # Same rows as list_threads, plus the tags column
+    assert [t[:5] for t in threads] == list_threads(db_path=test_db)
+
 
 def test_archive_unarchive(test_db):
     """Test archiving and unarchiving threads."""
@@ -153,6 +513,10 @@ def test_archive_unarchive(test_db):
     thread1 = get_thread_by_id(thread_id1, db_path=test_db)
     assert thread1[4]  # is_archived is True
 
+    # Archiving again reports no change; unknown threads report None
+    assert archive_thread(thread_id1, db_path=test_db) is False
+    assert archive_thread(999, db_path=test_db) is None
+
     # Verify listing only shows thread 2 by default
     threads = list_threads(db_path=test_db, include_archived=False)
     assert len(threads) == 1
@@ -169,6 +533,8 @@ def test_archive_unarchive(test_db):
     # Verify thread 1 is active again
     thread1 = get_thread_by_id(thread_id1, db_path=test_db)
     assert not thread1[4]  # is_archived is False
+    assert unarchive_thread(thread_id1, db_path=test_db) is False
+    assert unarchive_thread(999, db_path=test_db) is None
 
     # Verify listing shows both threads
     threads = list_threads(db_path=test_db)